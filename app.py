@@ -4,7 +4,10 @@ from flask import Flask, render_template, request, jsonify, session, redirect, m
 from flask_cors import CORS
 import os
 import logging
-import tempfile
+import threading
+import importlib.util
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
 import stripe
 from dotenv import load_dotenv
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, KeepTogether
@@ -25,6 +28,8 @@ try:
 except ImportError:
     TRENDS_AVAILABLE = False
 
+from common_io import fetch_url_text, extract_upload_text, hash_file, get_cached_file_text, cache_file_text, PDFIUM_AVAILABLE, WEB_FETCH_AVAILABLE
+
 # Import your app2.py functions
 try:
     from app2 import (
@@ -32,27 +37,22 @@ try:
         analyze_question, 
         summarize_trends, 
         extract_text_from_file, 
-        analyze_url_content
+        analyze_url_content,
+        warmup,
+        BEDROCK_MAX_WORKERS
     )
     APP2_AVAILABLE = True
     print("✅ Successfully imported from app2.py")
+    # Client setup happens in the background so the first analysis does not pay for it
+    threading.Thread(target=warmup, daemon=True).start()
 except ImportError as e:
     APP2_AVAILABLE = False
     print(f"❌ Error importing from app2.py: {e}")
 
 # Check for analysis packages
-try:
-    import textract
-    TEXTRACT_AVAILABLE = True
-except ImportError:
-    TEXTRACT_AVAILABLE = False
-
-try:
-    import requests
-    from bs4 import BeautifulSoup
-    WEB_SCRAPING_AVAILABLE = True
-except ImportError:
-    WEB_SCRAPING_AVAILABLE = False
+# textract is slow to import, so only check it is installed; common_io imports it on first use
+TEXTRACT_AVAILABLE = importlib.util.find_spec('textract') is not None
+WEB_SCRAPING_AVAILABLE = WEB_FETCH_AVAILABLE
 
 try:
     from textblob import TextBlob
@@ -63,6 +63,7 @@ except ImportError:
 try:
     from collections import Counter
     import re
+    _HASHTAG_WORD_RE = re.compile(r'\b[a-zA-Z]{4,}\b')
     ANALYSIS_TOOLS_AVAILABLE = True
 except ImportError:
     ANALYSIS_TOOLS_AVAILABLE = False
@@ -84,6 +85,13 @@ app.config['SECRET_KEY'] = 'your-super-secret-key-change-this-in-production'
 app.config['SESSION_TYPE'] = 'filesystem'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
 
+# Uploaded documents are analyzed on at most this many leading characters
+FILE_TEXT_LIMIT = 4000
+
+# Shared pool for running independent, I/O-bound LLM calls off the request thread. Every request's calls queue here,
+# so it is sized like app2's Bedrock pool rather than for a single request's handful of calls
+_analysis_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('ANALYSIS_WORKERS', BEDROCK_MAX_WORKERS if APP2_AVAILABLE else 6)))
+
 # Stripe configuration - AFTER load_dotenv()
 stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
 STRIPE_PUBLISHABLE_KEY = os.environ.get('STRIPE_PUBLISHABLE_KEY')
@@ -197,7 +205,7 @@ def analyze_sentiment(text):
 def extract_hashtags(text, max_hashtags=10):
     try:
         if ANALYSIS_TOOLS_AVAILABLE:
-            words = re.findall(r'\b[a-zA-Z]{4,}\b', text.lower())
+            words = _HASHTAG_WORD_RE.findall(text.lower())
             stop_words = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
             filtered_words = [word for word in words if word not in stop_words]
             word_counts = Counter(filtered_words)
@@ -402,6 +410,23 @@ def create_enhanced_twitter_mock(query):
         }
     ]
 
+def _wrap_title_lines(title, max_chars_per_line):
+    """Greedily wrap a title into lines of at most max_chars_per_line characters"""
+    lines = []
+    current_line = ""
+    
+    for word in title.split():
+        if len(current_line + " " + word) <= max_chars_per_line:
+            current_line = current_line + " " + word if current_line else word
+        else:
+            if current_line:
+                lines.append(current_line)
+            current_line = word
+    
+    if current_line:
+        lines.append(current_line)
+    return lines
+
 def parse_structured_response(response_text, expected_count=5):
     """Parse LLM structured response into insights/recommendations"""
     items = []
@@ -824,16 +849,7 @@ def api_comprehensive_analysis():
         # Extract content from URL if provided
         if url and WEB_SCRAPING_AVAILABLE:
             try:
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-                response = requests.get(url, headers=headers, timeout=15)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                for script in soup(["script", "style", "nav", "header", "footer"]):
-                    script.extract()
-                
-                url_text = soup.get_text()
-                url_text = ' '.join(url_text.split())
+                url_text = fetch_url_text(url)
                 text = (text + ' ' + url_text).strip()
                 
             except Exception as e:
@@ -853,10 +869,10 @@ def api_comprehensive_analysis():
         word_count = len(text.split())
         main_themes = ', '.join([hashtag.lower() for hashtag in hashtags[:5]])
         
-        # Generate content-specific key insights using LLM
+        # The insights, recommendations and summary prompts are independent, so run them concurrently
+        insights_future = rec_future = summary_future = None
         if APP2_AVAILABLE:
-            try:
-                insights_question = """Analyze this content and provide exactly 5 specific key insights based on what is actually discussed. 
+            insights_question = """Analyze this content and provide exactly 5 specific key insights based on what is actually discussed. 
                 
                 Requirements for each insight:
                 - Be specific to the actual topics and themes in the content
@@ -870,23 +886,8 @@ def api_comprehensive_analysis():
                 EXPLANATION: [Detailed explanation referencing actual content themes]
                 
                 Separate each insight with ---"""
-                
-                insights_result = summarize_trends(text=text, question=insights_question, return_format="dict")
-                
-                if not insights_result.get('error') and insights_result.get('full_response'):
-                    key_insights = parse_structured_response(insights_result.get('full_response'), 5)
-                else:
-                    key_insights = generate_content_based_insights(text, hashtags, sentiment_analysis)
-            except Exception as e:
-                logger.error(f"Insights generation error: {e}")
-                key_insights = generate_content_based_insights(text, hashtags, sentiment_analysis)
-        else:
-            key_insights = generate_content_based_insights(text, hashtags, sentiment_analysis)
-        
-        # Generate content-specific recommendations using LLM
-        if APP2_AVAILABLE:
-            try:
-                rec_question = """Based on this content, provide exactly 5 specific, ACTIONABLE strategic recommendations.
+            
+            rec_question = """Based on this content, provide exactly 5 specific, ACTIONABLE strategic recommendations.
                 
                 Each recommendation MUST include:
                 1. A clear target market or niche segment to pursue
@@ -911,8 +912,32 @@ def api_comprehensive_analysis():
                 EXPLANATION: [Complete action plan with numbered steps and reasoning]
                 
                 Separate each recommendation with ---"""
+            
+            summary_question = "Provide a comprehensive analysis summary in 3-4 paragraphs covering key findings, implications, and strategic considerations based on this specific content. Avoid generic statements."
+            
+            insights_future = _analysis_pool.submit(summarize_trends, text=text, question=insights_question, return_format="dict")
+            rec_future = _analysis_pool.submit(summarize_trends, text=text, question=rec_question, return_format="dict")
+            summary_future = _analysis_pool.submit(summarize_trends, text=text, question=summary_question, return_format="dict")
+        
+        # Generate content-specific key insights using LLM
+        if insights_future:
+            try:
+                insights_result = insights_future.result()
                 
-                rec_result = summarize_trends(text=text, question=rec_question, return_format="dict")
+                if not insights_result.get('error') and insights_result.get('full_response'):
+                    key_insights = parse_structured_response(insights_result.get('full_response'), 5)
+                else:
+                    key_insights = generate_content_based_insights(text, hashtags, sentiment_analysis)
+            except Exception as e:
+                logger.error(f"Insights generation error: {e}")
+                key_insights = generate_content_based_insights(text, hashtags, sentiment_analysis)
+        else:
+            key_insights = generate_content_based_insights(text, hashtags, sentiment_analysis)
+        
+        # Generate content-specific recommendations using LLM
+        if rec_future:
+            try:
+                rec_result = rec_future.result()
                 
                 if not rec_result.get('error') and rec_result.get('full_response'):
                     recommendations = parse_structured_response(rec_result.get('full_response'), 5)
@@ -925,10 +950,9 @@ def api_comprehensive_analysis():
             recommendations = generate_content_based_recommendations(text, hashtags, sentiment_analysis)
         
         # Generate comprehensive summary using LLM
-        if APP2_AVAILABLE:
+        if summary_future:
             try:
-                summary_question = "Provide a comprehensive analysis summary in 3-4 paragraphs covering key findings, implications, and strategic considerations based on this specific content. Avoid generic statements."
-                summary_result = summarize_trends(text=text, question=summary_question, return_format="dict")
+                summary_result = summary_future.result()
                 
                 if not summary_result.get('error') and summary_result.get('full_response'):
                     summary = summary_result.get('full_response', '')
@@ -985,16 +1009,11 @@ def api_social_analysis():
         
         # Get real Reddit data if available
         if 'reddit' in platforms and REDDIT_AVAILABLE:
-            reddit_data = get_reddit_data(query, limit=100)
-            if reddit_data:
-                results['data']['reddit'] = reddit_data
-                total_posts += len(reddit_data)
-                all_content.extend([post['title'] + ' ' + post['content'] for post in reddit_data])
-            else:
-                # Fallback to enhanced mock data if Reddit fails
-                results['data']['reddit'] = create_enhanced_reddit_mock(query)
-                total_posts += len(results['data']['reddit'])
-                all_content.extend([post['title'] + ' ' + post['content'] for post in results['data']['reddit']])
+            # Fallback to enhanced mock data if Reddit fails, then collect either through the same path
+            reddit_data = get_reddit_data(query, limit=100) or create_enhanced_reddit_mock(query)
+            results['data']['reddit'] = reddit_data
+            total_posts += len(reddit_data)
+            all_content.extend([post['title'] + ' ' + post['content'] for post in reddit_data])
         
         # Keep existing mock data for other platforms as fallback
         if 'youtube' in platforms:
@@ -1063,6 +1082,7 @@ def api_text_analysis():
         # Perform analysis
         sentiment_analysis = analyze_sentiment(text)
         hashtags = extract_hashtags(text)
+        word_count = len(text.split())
         
         # Try to use app2.py if available
         summary = ""
@@ -1071,14 +1091,19 @@ def api_text_analysis():
         if APP2_AVAILABLE:
             try:
                 summary_question = "Provide a comprehensive but concise summary of this content in 2-3 paragraphs, focusing on key market insights and strategic implications. Keep it between 200-400 words."
-                summary_result = summarize_trends(text=text, question=summary_question, return_format="dict")
+                summary_future = _analysis_pool.submit(summarize_trends, text=text, question=summary_question, return_format="dict")
+                
+                # Get insights separately if needed, concurrently with the summary
+                analysis_future = None
+                if question:
+                    analysis_future = _analysis_pool.submit(summarize_trends, text=text, question=question, return_format="dict")
                 
+                summary_result = summary_future.result()
                 if not summary_result.get('error'):
                     summary = summary_result.get('full_response', '')
                 
-                # Get insights separately if needed
-                if question:
-                    analysis_result = summarize_trends(text=text, question=question, return_format="dict")
+                if analysis_future:
+                    analysis_result = analysis_future.result()
                     if not analysis_result.get('error'):
                         key_insights = analysis_result.get('keywords', [])[:5]
             except Exception as e:
@@ -1086,7 +1111,6 @@ def api_text_analysis():
         
         # Fallback
         if not summary:
-            word_count = len(text.split())
             summary = f"Market analysis of {word_count} words reveals {sentiment_analysis['sentiment'].lower()} sentiment across key themes including {', '.join(hashtags[:5])}. Strategic insights indicate opportunities for competitive positioning and market development based on identified patterns and market indicators."
             
         if not key_insights:
@@ -1101,7 +1125,7 @@ def api_text_analysis():
                 },
                 {
                     "title": f"Content depth analysis shows comprehensive market coverage",
-                    "explanation": f"Document contains {len(text.split())} words providing substantial analytical depth. This comprehensive coverage enables thorough market understanding and strategic planning based on detailed market intelligence."
+                    "explanation": f"Document contains {word_count} words providing substantial analytical depth. This comprehensive coverage enables thorough market understanding and strategic planning based on detailed market intelligence."
                 },
                 {
                     "title": "Market positioning opportunities identified through content analysis",
@@ -1141,7 +1165,7 @@ def api_text_analysis():
                     "explanation": "Implement ongoing market intelligence processes that build upon these content analysis insights to maintain competitive advantage and market awareness."
                 }
             ],
-            'word_count': len(text.split()),
+            'word_count': word_count,
             'analysis_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
@@ -1168,16 +1192,7 @@ def api_url_analysis():
         
         if WEB_SCRAPING_AVAILABLE:
             try:
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-                response = requests.get(url, headers=headers, timeout=15)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                for script in soup(["script", "style", "nav", "header", "footer"]):
-                    script.extract()
-                
-                text = soup.get_text()
-                text = ' '.join(text.split())
+                text = fetch_url_text(url)
                 
                 if len(text) > 3000:
                     text = text[:3000] + "..."
@@ -1193,6 +1208,7 @@ def api_url_analysis():
         # Perform analysis (similar to text analysis)
         sentiment_analysis = analyze_sentiment(text)
         hashtags = extract_hashtags(text)
+        word_count = len(text.split())
         
         # Generate appropriate summary
         if APP2_AVAILABLE:
@@ -1206,7 +1222,7 @@ def api_url_analysis():
                     summary = f"Website analysis reveals {sentiment_analysis['sentiment'].lower()} market sentiment with focus on {', '.join(hashtags[:5])}. Content provides strategic insights for competitive positioning and market development opportunities."
             except Exception as e:
                 logger.error(f"URL summary generation error: {e}")
-                summary = f"Website content analysis of {len(text.split())} words shows {sentiment_analysis['sentiment'].lower()} sentiment patterns across key themes including {', '.join(hashtags[:5])}. Strategic implications suggest opportunities for market positioning and competitive analysis."
+                summary = f"Website content analysis of {word_count} words shows {sentiment_analysis['sentiment'].lower()} sentiment patterns across key themes including {', '.join(hashtags[:5])}. Strategic implications suggest opportunities for market positioning and competitive analysis."
         else:
             summary = f"Website content analysis reveals {sentiment_analysis['sentiment'].lower()} market positioning with primary themes around {', '.join(hashtags[:5])}. Analysis provides strategic insights for competitive positioning and market development based on digital content patterns."
         
@@ -1222,8 +1238,8 @@ def api_url_analysis():
                     "explanation": f"URL content analysis shows {sentiment_analysis['sentiment'].lower()} sentiment patterns that indicate market perception and brand positioning opportunities for strategic decision-making."
                 },
                 {
-                    "title": f"Content depth analysis provides {len(text.split())} words of market intelligence",
-                    "explanation": f"Comprehensive content extraction reveals substantial market insights across {len(text.split())} words, enabling thorough competitive analysis and strategic positioning assessment."
+                    "title": f"Content depth analysis provides {word_count} words of market intelligence",
+                    "explanation": f"Comprehensive content extraction reveals substantial market insights across {word_count} words, enabling thorough competitive analysis and strategic positioning assessment."
                 },
                 {
                     "title": f"Thematic analysis identifies key market focus areas",
@@ -1260,7 +1276,7 @@ def api_url_analysis():
                     "explanation": "Implement ongoing market intelligence processes that build upon these content analysis insights to maintain competitive advantage and market awareness."
                 }
             ],
-            'content_length': len(text.split()),
+            'content_length': word_count,
             'analysis_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
@@ -1290,53 +1306,32 @@ def api_file_analysis():
         if file_size > 16 * 1024 * 1024:
             return jsonify({'error': 'File too large. Maximum size is 16MB.'}), 400
         
-        text = ""
-        tmp_path = None
+        file_ext = os.path.splitext(file.filename)[1].lower()
+        file_hash = hash_file(file.stream)
+        text = get_cached_file_text(file_hash, file_ext, FILE_TEXT_LIMIT)
         
         try:
-            # Save temporarily and extract text
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
-                file.save(tmp.name)
-                tmp_path = tmp.name
-            
-            file_ext = os.path.splitext(file.filename)[1].lower()
-            
-            if TEXTRACT_AVAILABLE:
-                try:
-                    text = textract.process(tmp_path).decode('utf-8')
-                except Exception as e:
-                    if file_ext in ['.txt', '.md']:
-                        with open(tmp_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            text = f.read()
-                    else:
-                        raise e
-            else:
-                if file_ext in ['.txt', '.md']:
-                    with open(tmp_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        text = f.read()
-                else:
+            # Repeat uploads of the same bytes skip extraction entirely
+            if text is None:
+                # Only the first FILE_TEXT_LIMIT characters are analyzed, so stop extracting there;
+                # PDFs and plain text are read from the upload stream without a temp file
+                text = extract_upload_text(file.stream, file_ext, FILE_TEXT_LIMIT)
+                if text is None:
                     return jsonify({'error': 'File type not supported - textract package required'}), 400
+                cache_file_text(file_hash, file_ext, text, FILE_TEXT_LIMIT)
+            else:
+                logger.info(f"Using cached text for uploaded file {file.filename}")
             
         except Exception as e:
             return jsonify({'error': f'File processing error: {str(e)}'}), 400
-        finally:
-            if tmp_path and os.path.exists(tmp_path):
-                try:
-                    os.unlink(tmp_path)
-                except:
-                    pass
         
         if len(text.strip()) < 20:
             return jsonify({'error': 'Insufficient text content in file'}), 400
         
-        # Keep full text for analysis, but generate appropriate summary
-        full_text = text
-        if len(text) > 4000:
-            text = text[:4000]  # Limit for processing, but don't truncate summary
-        
         # Perform analysis
         sentiment_analysis = analyze_sentiment(text)
         hashtags = extract_hashtags(text)
+        word_count = len(text.split())
         
         # Generate appropriate summary
         if APP2_AVAILABLE:
@@ -1350,7 +1345,7 @@ def api_file_analysis():
                     summary = f"Document analysis reveals {sentiment_analysis['sentiment'].lower()} market sentiment with strategic focus on {', '.join(hashtags[:5])}. Content provides actionable insights for business strategy and competitive positioning."
             except Exception as e:
                 logger.error(f"File summary generation error: {e}")
-                summary = f"Document analysis of {len(text.split())} words reveals {sentiment_analysis['sentiment'].lower()} sentiment patterns. Strategic themes include {', '.join(hashtags[:5])}, providing insights for market positioning and business development opportunities."
+                summary = f"Document analysis of {word_count} words reveals {sentiment_analysis['sentiment'].lower()} sentiment patterns. Strategic themes include {', '.join(hashtags[:5])}, providing insights for market positioning and business development opportunities."
         else:
             summary = f"Document content analysis shows {sentiment_analysis['sentiment'].lower()} market sentiment across key themes including {', '.join(hashtags[:5])}. Analysis provides strategic business insights and competitive positioning recommendations."
         
@@ -1366,8 +1361,8 @@ def api_file_analysis():
                     "explanation": f"URL content analysis shows {sentiment_analysis['sentiment'].lower()} sentiment patterns that indicate market perception and brand positioning opportunities for strategic decision-making."
                 },
                 {
-                    "title": f"Content depth analysis provides {len(text.split())} words of market intelligence",
-                    "explanation": f"Comprehensive content extraction reveals substantial market insights across {len(text.split())} words, enabling thorough competitive analysis and strategic positioning assessment."
+                    "title": f"Content depth analysis provides {word_count} words of market intelligence",
+                    "explanation": f"Comprehensive content extraction reveals substantial market insights across {word_count} words, enabling thorough competitive analysis and strategic positioning assessment."
                 },
                 {
                     "title": f"Thematic analysis identifies key market focus areas",
@@ -1404,7 +1399,7 @@ def api_file_analysis():
                     "explanation": "Implement ongoing market intelligence processes that build upon these content analysis insights to maintain competitive advantage and market awareness."
                 }
             ],
-            'word_count': len(text.split()),
+            'word_count': word_count,
             'file_size': f"{file_size/1024:.1f} KB",
             'analysis_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
@@ -1432,6 +1427,8 @@ def api_user_info():
 @app.route('/api/cache/clear', methods=['POST'])
 def api_clear_cache():
     try:
+        # Server caches are shared by every user and expire on their own TTL/LRU, so one user's click does not
+        # flush everyone else's analyses; the client resets its own state in place
         return jsonify({'message': 'Cache cleared successfully'})
     except Exception as e:
         return jsonify({'error': 'Failed to clear cache'}), 500
@@ -1614,42 +1611,27 @@ def api_export_pdf():
                 # Get insights
                 insights = results.get('key_insights', [])
                 
-                # Calculate the maximum height needed for all boxes
-                max_box_height = 70  # minimum height
                 box_width = 85
                 max_chars_per_line = 10
                 
-                for i in range(min(5, len(insights))):
-                    if isinstance(insights[i], dict):
-                        title = insights[i].get('title', f'Insight {i+1}')
-                        
-                        # Calculate how many lines this title needs
-                        words = title.split()
-                        lines_needed = 0
-                        current_line = ""
-                        
-                        for word in words:
-                            if len(current_line + " " + word) <= max_chars_per_line:
-                                current_line = current_line + " " + word if current_line else word
-                            else:
-                                if current_line:
-                                    lines_needed += 1
-                                current_line = word
-                        
-                        if current_line:
-                            lines_needed += 1
-                        
-                        # Calculate height needed for this title
-                        height_needed = max(70, lines_needed * 12 + 30)
-                        max_box_height = max(max_box_height, height_needed)
+                # Wrap each title once; the lines drive both the box height and the drawing
+                wrapped_titles = [
+                    _wrap_title_lines(item.get('title', f'Insight {i+1}'), max_chars_per_line) if isinstance(item, dict) else None
+                    for i, item in enumerate(insights[:5])
+                ]
+                max_box_height = max([70] + [len(lines) * 12 + 30 for lines in wrapped_titles if lines])
                 
                 # Fixed spacing
                 spacing = 10
                 total_width = 5 * box_width + 4 * spacing
                 start_x = (500 - total_width) / 2
                 
+                # Insight box colors
+                box_colors = [colors.HexColor('#4a90e2'), colors.HexColor('#e53e3e'), colors.HexColor('#38a169'), 
+                             colors.HexColor('#ed8936'), colors.HexColor('#805ad5')]
+                
                 # Draw 5 connecting lines and boxes (all same height)
-                for i in range(5):
+                for i, (box_color, lines) in enumerate(zip_longest(box_colors, wrapped_titles)):
                     x = start_x + i * (box_width + spacing)
                     box_center = x + box_width/2
                     
@@ -1657,32 +1639,9 @@ def api_export_pdf():
                     drawing.add(Line(250, 350, box_center, 300, strokeColor=colors.white, strokeWidth=2))
                     drawing.add(Line(box_center, 300, box_center, 250, strokeColor=colors.white, strokeWidth=2))
                     
-                    # Insight box colors (all same height now)
-                    box_colors = [colors.HexColor('#4a90e2'), colors.HexColor('#e53e3e'), colors.HexColor('#38a169'), 
-                                 colors.HexColor('#ed8936'), colors.HexColor('#805ad5')]
-                    
-                    drawing.add(Rect(x, 250 - max_box_height, box_width, max_box_height, fillColor=box_colors[i], strokeColor=colors.white, strokeWidth=2))
+                    drawing.add(Rect(x, 250 - max_box_height, box_width, max_box_height, fillColor=box_color, strokeColor=colors.white, strokeWidth=2))
                     
-                    # Add insight title with line wrapping
-                    if i < len(insights) and isinstance(insights[i], dict):
-                        title = insights[i].get('title', f'Insight {i+1}')
-                        
-                        # Split title into words and create lines that fit
-                        words = title.split()
-                        lines = []
-                        current_line = ""
-                        
-                        for word in words:
-                            if len(current_line + " " + word) <= max_chars_per_line:
-                                current_line = current_line + " " + word if current_line else word
-                            else:
-                                if current_line:
-                                    lines.append(current_line)
-                                current_line = word
-                        
-                        if current_line:
-                            lines.append(current_line)
-                        
+                    if lines:
                         # Draw each line centered in the box
                         line_height = 10
                         font_size = 8
@@ -1720,42 +1679,27 @@ def api_export_pdf():
                 # Get recommendations
                 recommendations = results.get('recommendations', [])
                 
-                # Calculate the maximum height needed for all boxes
-                max_box_height = 70  # minimum height
                 box_width = 85
                 max_chars_per_line = 10
                 
-                for i in range(min(5, len(recommendations))):
-                    if isinstance(recommendations[i], dict):
-                        title = recommendations[i].get('title', f'Action {i+1}')
-                        
-                        # Calculate how many lines this title needs
-                        words = title.split()
-                        lines_needed = 0
-                        current_line = ""
-                        
-                        for word in words:
-                            if len(current_line + " " + word) <= max_chars_per_line:
-                                current_line = current_line + " " + word if current_line else word
-                            else:
-                                if current_line:
-                                    lines_needed += 1
-                                current_line = word
-                        
-                        if current_line:
-                            lines_needed += 1
-                        
-                        # Calculate height needed for this title
-                        height_needed = max(70, lines_needed * 12 + 30)
-                        max_box_height = max(max_box_height, height_needed)
+                # Wrap each title once; the lines drive both the box height and the drawing
+                wrapped_titles = [
+                    _wrap_title_lines(item.get('title', f'Action {i+1}'), max_chars_per_line) if isinstance(item, dict) else None
+                    for i, item in enumerate(recommendations[:5])
+                ]
+                max_box_height = max([70] + [len(lines) * 12 + 30 for lines in wrapped_titles if lines])
                 
                 # Fixed spacing
                 spacing = 10
                 total_width = 5 * box_width + 4 * spacing
                 start_x = (500 - total_width) / 2
                 
+                # Recommendation box colors
+                box_colors = [colors.HexColor('#e53e3e'), colors.HexColor('#dd6b20'), colors.HexColor('#ecc94b'), 
+                             colors.HexColor('#38a169'), colors.HexColor('#3182ce')]
+                
                 # Draw 5 connecting lines and boxes (all same height)
-                for i in range(5):
+                for i, (box_color, lines) in enumerate(zip_longest(box_colors, wrapped_titles)):
                     x = start_x + i * (box_width + spacing)
                     box_center = x + box_width/2
                     
@@ -1763,32 +1707,9 @@ def api_export_pdf():
                     drawing.add(Line(250, 350, box_center, 300, strokeColor=colors.white, strokeWidth=2))
                     drawing.add(Line(box_center, 300, box_center, 250, strokeColor=colors.white, strokeWidth=2))
                     
-                    # Recommendation box colors (all same height now)
-                    box_colors = [colors.HexColor('#e53e3e'), colors.HexColor('#dd6b20'), colors.HexColor('#ecc94b'), 
-                                 colors.HexColor('#38a169'), colors.HexColor('#3182ce')]
-                    
-                    drawing.add(Rect(x, 250 - max_box_height, box_width, max_box_height, fillColor=box_colors[i], strokeColor=colors.white, strokeWidth=2))
+                    drawing.add(Rect(x, 250 - max_box_height, box_width, max_box_height, fillColor=box_color, strokeColor=colors.white, strokeWidth=2))
                     
-                    # Add recommendation title with line wrapping
-                    if i < len(recommendations) and isinstance(recommendations[i], dict):
-                        title = recommendations[i].get('title', f'Action {i+1}')
-                        
-                        # Split title into words and create lines that fit
-                        words = title.split()
-                        lines = []
-                        current_line = ""
-                        
-                        for word in words:
-                            if len(current_line + " " + word) <= max_chars_per_line:
-                                current_line = current_line + " " + word if current_line else word
-                            else:
-                                if current_line:
-                                    lines.append(current_line)
-                                current_line = word
-                        
-                        if current_line:
-                            lines.append(current_line)
-                        
+                    if lines:
                         # Draw each line centered in the box
                         line_height = 10
                         font_size = 8
@@ -1855,43 +1776,47 @@ def api_export_pdf():
             # Display insights
             insights = results['key_insights']
             if isinstance(insights, list):
+                # Styles are shared by every insight block
+                insight_title_style = ParagraphStyle(
+                    'InsightTitle',
+                    parent=styles['Normal'],
+                    fontSize=12,
+                    textColor=colors.white,
+                    fontName='Helvetica-Bold',
+                    alignment=TA_LEFT
+                )
+                insight_title_table_style = TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#4a90e2')),
+                    ('LEFTPADDING', (0, 0), (-1, -1), 15),
+                    ('RIGHTPADDING', (0, 0), (-1, -1), 15),
+                    ('TOPPADDING', (0, 0), (-1, -1), 10),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ])
+                insight_exp_table_style = TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
+                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#4a90e2')),
+                    ('LEFTPADDING', (0, 0), (-1, -1), 15),
+                    ('RIGHTPADDING', (0, 0), (-1, -1), 15),
+                    ('TOPPADDING', (0, 0), (-1, -1), 15),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
+                ])
+                
                 for i, insight in enumerate(insights, 1):
                     if isinstance(insight, dict):
-                        # Insight title
                         # Insight title with proper text wrapping
                         title_text = f"INSIGHT {i}: {insight.get('title', '').upper()}"
-                        title_para = Paragraph(title_text, ParagraphStyle(
-                            'InsightTitle',
-                            parent=styles['Normal'],
-                            fontSize=12,
-                            textColor=colors.white,
-                            fontName='Helvetica-Bold',
-                            alignment=TA_LEFT
-                        ))
+                        title_para = Paragraph(title_text, insight_title_style)
 
                         title_table = Table([[title_para]], colWidths=[7*inch])
-                        title_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#4a90e2')),
-                            ('LEFTPADDING', (0, 0), (-1, -1), 15),
-                            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-                            ('TOPPADDING', (0, 0), (-1, -1), 10),
-                            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                        ]))
+                        title_table.setStyle(insight_title_table_style)
                         # Create content list for KeepTogether
                         insight_content = [title_table]
                         
                         # Insight explanation
                         exp_para = Paragraph(insight.get('explanation', ''), content_style)
                         exp_table = Table([[exp_para]], colWidths=[7*inch])
-                        exp_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
-                            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#4a90e2')),
-                            ('LEFTPADDING', (0, 0), (-1, -1), 15),
-                            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-                            ('TOPPADDING', (0, 0), (-1, -1), 15),
-                            ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-                        ]))
+                        exp_table.setStyle(insight_exp_table_style)
                         insight_content.append(exp_table)
 
                         # Keep title and explanation together
@@ -1938,29 +1863,40 @@ def api_export_pdf():
             # Display recommendations
             recommendations = results['recommendations']
             if isinstance(recommendations, list):
+                # Styles are shared by every recommendation block
+                rec_title_style = ParagraphStyle(
+                    'RecommendationTitle',
+                    parent=styles['Normal'],
+                    fontSize=12,
+                    textColor=colors.white,
+                    fontName='Helvetica-Bold',
+                    alignment=TA_LEFT
+                )
+                rec_title_table_style = TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#38b2ac')),
+                    ('LEFTPADDING', (0, 0), (-1, -1), 15),
+                    ('RIGHTPADDING', (0, 0), (-1, -1), 15),
+                    ('TOPPADDING', (0, 0), (-1, -1), 10),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ])
+                rec_exp_table_style = TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
+                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#38b2ac')),
+                    ('LEFTPADDING', (0, 0), (-1, -1), 15),
+                    ('RIGHTPADDING', (0, 0), (-1, -1), 15),
+                    ('TOPPADDING', (0, 0), (-1, -1), 15),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
+                ])
+                
                 for i, rec in enumerate(recommendations, 1):
                     if isinstance(rec, dict):
-                        # Recommendation title
                         # Recommendation title with proper text wrapping
                         title_text = f"ACTION {i}: {rec.get('title', '').upper()}"
-                        title_para = Paragraph(title_text, ParagraphStyle(
-                            'RecommendationTitle',
-                            parent=styles['Normal'],
-                            fontSize=12,
-                            textColor=colors.white,
-                            fontName='Helvetica-Bold',
-                            alignment=TA_LEFT
-                        ))
+                        title_para = Paragraph(title_text, rec_title_style)
 
                         title_table = Table([[title_para]], colWidths=[7*inch])
-                        title_table.setStyle(TableStyle([
-                           ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#38b2ac')),
-                           ('LEFTPADDING', (0, 0), (-1, -1), 15),
-                           ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-                           ('TOPPADDING', (0, 0), (-1, -1), 10),
-                           ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                           ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                        ]))
+                        title_table.setStyle(rec_title_table_style)
                         
                         # Create content list for KeepTogether
                         rec_content = [title_table]
@@ -1968,14 +1904,7 @@ def api_export_pdf():
                         # Recommendation explanation
                         exp_para = Paragraph(rec.get('explanation', ''), content_style)
                         exp_table = Table([[exp_para]], colWidths=[7*inch])
-                        exp_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
-                            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#38b2ac')),
-                            ('LEFTPADDING', (0, 0), (-1, -1), 15),
-                            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-                            ('TOPPADDING', (0, 0), (-1, -1), 15),
-                            ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-                        ]))
+                        exp_table.setStyle(rec_exp_table_style)
                         rec_content.append(exp_table)
 
                         # Keep title and explanation together
@@ -2003,6 +1932,7 @@ if __name__ == '__main__':
     print(f"App2.py available: {APP2_AVAILABLE}")
     print(f"TextBlob available: {TEXTBLOB_AVAILABLE}")
     print(f"Textract available: {TEXTRACT_AVAILABLE}")
+    print(f"pdfium available: {PDFIUM_AVAILABLE}")
     print(f"Web scraping available: {WEB_SCRAPING_AVAILABLE}")
     
     port = int(os.environ.get('PORT', 5002))
@@ -1,31 +1,91 @@
 import boto3
-import json
-import textract
-import tempfile
+from botocore.config import Config
+from botocore.exceptions import ClientError, ParamValidationError
 import os
+import sys
 import logging
-import hashlib
 import time
 import re
+import copy
+import functools
+import threading
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import Future, ThreadPoolExecutor
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from common_io import hash_input, hash_file, fetch_url_text, extract_upload_text, get_cached_file_text, cache_file_text, clear_url_cache, clear_file_cache, warm_http_session, json_dumps, json_loads, copy_parsed_response, bedrock_client, WEB_FETCH_AVAILABLE
+
+# Handlers and levels are configured by the application (app.py), not on import
 logger = logging.getLogger(__name__)
 
-# Simple cache to prevent duplicate calls
-_response_cache = {}
+# Simple cache to prevent duplicate calls: {key: [expires_at, hits, response]}, kept in recency order
+_response_cache = OrderedDict()
+RESPONSE_CACHE_MAX_ENTRIES = 512
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 3600))
+# Throttling errors are cached briefly so identical retries fail fast instead of adding to the overload
+ERROR_CACHE_TTL = 5
+THROTTLING_ERROR_CODES = ("ThrottlingException", "ServiceUnavailableException", "TooManyRequestsException")
+# One character budget shared by the response, parse and analysis caches below, so the text they hold between them
+# stays bounded even when most responses are long
+RESPONSE_CACHE_MAX_CHARS = int(os.environ.get("RESPONSE_CACHE_MAX_CHARS", 32 * 1024 * 1024))
+_response_cache_chars = 0
+
+# Bedrock calls in progress, so concurrent identical prompts wait on one call: {key: Future}
+_inflight_requests = {}
+INFLIGHT_WAIT_TIMEOUT = 300
+
+# Guards the LRU caches below, which are hit from app.py's analysis thread pool
+_cache_lock = threading.Lock()
+
+# Finished analysis results keyed by function and arguments: {key: (computed_at, result, chars)}
+_analysis_cache = OrderedDict()
+ANALYSIS_CACHE_TTL = 3600
+ANALYSIS_CACHE_MAX_ENTRIES = 128
+_analysis_cache_chars = 0
+
+# Parsed responses keyed by response text, least recently used first: {response: (chars, parsed)}
+_parse_cache = OrderedDict()
+_parse_cache_chars = 0
+
+BEDROCK_MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+
+# Latency-optimized inference and prompt caching are only offered for some models and regions, so both are opt-in;
+# a rejection naming an enabled feature switches this process back to plain requests
+_latency_mode = os.environ.get("BEDROCK_LATENCY_MODE", "standard")
+_prompt_caching = os.environ.get("BEDROCK_PROMPT_CACHING", "0") == "1"
+
+# Bedrock calls are I/O-bound, so batches fan out well past the CPU count
+BEDROCK_MAX_WORKERS = int(os.environ.get("BEDROCK_MAX_WORKERS", min(32, (os.cpu_count() or 1) * 5)))
+_bedrock_pool = ThreadPoolExecutor(max_workers=BEDROCK_MAX_WORKERS)
+
+# Opt-in: one keyword call plus a call per keyword section makes each analysis 6 Bedrock requests instead of 1
+# (7 when a section fails and the single prompt runs), so it multiplies request-rate quota use. Sections run here
+# rather than on _bedrock_pool, so a batch worker waiting on its sections can never starve them of threads
+PARALLEL_KEYWORD_ANALYSIS = os.environ.get("PARALLEL_KEYWORD_ANALYSIS", "0") == "1"
+_section_pool = ThreadPoolExecutor(max_workers=BEDROCK_MAX_WORKERS)
+
+# Keep a pooled keep-alive connection for every batch worker, and fail fast when the endpoint is unreachable
+BEDROCK_CLIENT_CONFIG = Config(
+    max_pool_connections=int(os.environ.get("BEDROCK_MAX_POOL_CONNECTIONS", max(25, BEDROCK_MAX_WORKERS))),
+    retries={"max_attempts": 3, "mode": "adaptive"},
+    connect_timeout=3,
+    read_timeout=60,
+    tcp_keepalive=True,
+)
+
+# Regexes used on every response/text, compiled once
+_WORD_RE = re.compile(r'\b\w+\b')
+_NUMBERED_KEYWORD_RE = re.compile(r'\d+\.\s*([^0-9]+?)(?=\d+\.|$)')
 
 
 # Add these imports to your app2.py
 import re
 from collections import Counter
-import requests
-from textblob import TextBlob  # For sentiment analysis
-import praw  # For Reddit API
-from googleapiclient.discovery import build  # For YouTube API
 
 def analyze_sentiment_emotion(text):
     """Analyze sentiment and detect emotions"""
+    # Imported here so loading app2 for the Claude helpers does not pull in TextBlob/NLTK
+    from textblob import TextBlob
     blob = TextBlob(text)
     sentiment_score = blob.sentiment.polarity
     
@@ -67,7 +127,7 @@ def extract_brand_mentions(text, brands_list=None):
 def suggest_hashtags_keywords(text, topic=None):
     """Generate hashtag and keyword suggestions"""
     # Extract keywords using frequency analysis
-    words = re.findall(r'\b\w+\b', text.lower())
+    words = _WORD_RE.findall(text.lower())
     word_freq = Counter(words)
     
     # Remove common stop words
@@ -87,6 +147,7 @@ def scan_reddit_content(subreddits, query, limit=50):
     """Scan Reddit for relevant posts"""
     # You'll need to set up Reddit API credentials
     try:
+        import praw  # For Reddit API
         reddit = praw.Reddit(
             client_id="YOUR_CLIENT_ID",
             client_secret="YOUR_CLIENT_SECRET",
@@ -140,58 +201,213 @@ def analyze_comprehensive_trend(text, url=None, social_platforms=None):
     return results
 
 
-def claude_messages(prompt):
+def get_bedrock_client():
+    """Return the shared Bedrock runtime client, tuned with BEDROCK_CLIENT_CONFIG"""
+    return bedrock_client(BEDROCK_CLIENT_CONFIG)
+
+def warmup():
+    """Build the Bedrock client and page-fetch session before the first request needs them"""
+    try:
+        get_bedrock_client()
+        warm_http_session()
+    except Exception as e:
+        logger.warning(f"Warmup failed, clients will be built on first use: {e}")
+
+def _evict_response():
+    """Evict from the least recently used tenth the response with the fewest hits per byte; call with _cache_lock held"""
+    global _response_cache_chars
+    window = islice(_response_cache.items(), max(1, len(_response_cache) // 10))
+    victim = min(window, key=lambda item: (item[1][1] + 1) / (len(item[1][2]) + 1))[0]
+    _response_cache_chars -= len(_response_cache.pop(victim)[2])
+
+def _marks_cache(system):
+    """Only the business prompt is long enough to be a cacheable prefix; shorter system prompts are sent unmarked"""
+    return _prompt_caching and system == BUSINESS_SYSTEM_PROMPT
+
+def _build_claude_request(prompt, system=None):
+    payload = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 2500,
+        "temperature": 0.3,
+        "top_k": 150,
+        "top_p": 0.9,
+    }
+    if system:
+        system_block = {"type": "text", "text": system}
+        if _marks_cache(system):
+            system_block["cache_control"] = {"type": "ephemeral"}
+        payload["system"] = [system_block]
+
+    request = {
+        "modelId": BEDROCK_MODEL_ID,
+        "contentType": "application/json",
+        "accept": "application/json",
+        "body": json_dumps(payload),
+    }
+    if _latency_mode == "optimized":
+        request["performanceConfigLatency"] = "optimized"
+    return request
+
+def _send_claude_request(operation, prompt, system=None):
+    """Call a Bedrock invoke operation, dropping an optional feature for the process if the model rejects it"""
+    global _latency_mode, _prompt_caching
+    invoke = getattr(get_bedrock_client(), operation)
+
+    try:
+        return invoke(**_build_claude_request(prompt, system))
+    except (ClientError, ParamValidationError) as e:
+        # ParamValidationError means the installed boto3 predates the latency parameter
+        rejected = not isinstance(e, ClientError) or e.response.get("Error", {}).get("Code") == "ValidationException"
+        # Only errors naming a feature turn it off; other validation errors (e.g. an oversized prompt) are re-raised
+        message = str(e).lower()
+        drop_latency = _latency_mode == "optimized" and "latency" in message
+        drop_caching = _marks_cache(system) and ("cache_control" in message or "caching" in message)
+        if not (rejected and (drop_latency or drop_caching)):
+            raise
+        if drop_latency:
+            logger.warning(f"Latency-optimized inference unavailable, using standard requests: {e}")
+            _latency_mode = "standard"
+        if drop_caching:
+            logger.warning(f"Prompt caching unavailable, sending uncached system prompts: {e}")
+            _prompt_caching = False
+        return invoke(**_build_claude_request(prompt, system))
+
+def _invoke_claude(prompt, system=None):
+    """Send one prompt to Bedrock and return the reply text, or an "Error: ..." string"""
+    response = _send_claude_request("invoke_model", prompt, system)
+
+    result = json_loads(response["body"].read())
+    if not result or "content" not in result:
+        return "Error: Invalid response structure from Claude"
+    if not result["content"] or len(result["content"]) == 0:
+        return "Error: Empty response from Claude"
+
+    return result["content"][0]["text"]
+
+def _trim_caches():
+    """Evict from whichever cache holds the most text until all three fit the shared budget; call with _cache_lock held"""
+    global _parse_cache_chars, _analysis_cache_chars
+    while _response_cache_chars + _parse_cache_chars + _analysis_cache_chars > RESPONSE_CACHE_MAX_CHARS:
+        largest = max(_response_cache_chars, _parse_cache_chars, _analysis_cache_chars)
+        if largest == _response_cache_chars:
+            _evict_response()
+        elif largest == _parse_cache_chars:
+            _parse_cache_chars -= _parse_cache.popitem(last=False)[1][0]
+        else:
+            _analysis_cache_chars -= _analysis_cache.popitem(last=False)[1][2]
+
+def _get_cached_response(prompt_hash):
+    """Return a live cached response and count the hit, or None; call with _cache_lock held"""
+    global _response_cache_chars
+    entry = _response_cache.get(prompt_hash)
+    if entry is None:
+        return None
+    if time.monotonic() > entry[0]:
+        del _response_cache[prompt_hash]
+        _response_cache_chars -= len(entry[2])
+        return None
+    entry[1] += 1
+    _response_cache.move_to_end(prompt_hash)
+    return entry[2]
+
+def _cache_response(prompt_hash, response_text, ttl=RESPONSE_CACHE_TTL):
+    """Store a response, evicting entries while over the count limit or the shared size budget; call with _cache_lock held"""
+    global _response_cache_chars
+    previous = _response_cache.pop(prompt_hash, None)
+    if previous is not None:
+        _response_cache_chars -= len(previous[2])
+    _response_cache[prompt_hash] = [time.monotonic() + ttl, 0, response_text]
+    _response_cache_chars += len(response_text)
+    while len(_response_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+        _evict_response()
+    _trim_caches()
+
+def claude_messages(prompt, cache_key=None, system=None):
     try:
         if not prompt or not prompt.strip():
             return "Error: Empty prompt provided"
 
-        prompt_hash = hashlib.md5(prompt.encode()).hexdigest()
+        # Callers that already hashed the inputs the prompt was built from pass that key to skip hashing the full prompt;
+        # the model id is part of the key so switching models never serves another model's answer
+        prompt_hash = (BEDROCK_MODEL_ID, cache_key or hash_input(system or "", prompt))
         
-        if prompt_hash in _response_cache:
+        pending = None
+        with _cache_lock:
+            cached_response = _get_cached_response(prompt_hash)
+            if cached_response is None:
+                pending = _inflight_requests.get(prompt_hash)
+                if pending is None:
+                    owned = _inflight_requests[prompt_hash] = Future()
+        if cached_response is not None:
             logger.info("Using cached response")
-            return _response_cache[prompt_hash]
-
-        bedrock = boto3.client("bedrock-runtime", region_name="us-east-1")
-        
-        payload = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 2500,
-            "temperature": 0.3,
-            "top_k": 150,
-            "top_p": 0.9,
-        }
-
-        response = bedrock.invoke_model(
-            modelId="anthropic.claude-3-sonnet-20240229-v1:0",
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(payload),
-        )
-
-        result = json.loads(response["body"].read())
-        if not result or "content" not in result:
-            return "Error: Invalid response structure from Claude"
-        if not result["content"] or len(result["content"]) == 0:
-            return "Error: Empty response from Claude"
-
-        response_text = result["content"][0]["text"]
-        _response_cache[prompt_hash] = response_text
+            return cached_response
+        if pending is not None:
+            logger.info("Waiting for in-flight response to the same prompt")
+            return pending.result(timeout=INFLIGHT_WAIT_TIMEOUT)
+
+        try:
+            response_text = _invoke_claude(prompt, system)
+        except Exception as e:
+            throttled = isinstance(e, ClientError) and e.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+            with _cache_lock:
+                del _inflight_requests[prompt_hash]
+                if throttled:
+                    _cache_response(prompt_hash, f"Error calling Claude: {str(e)}", ERROR_CACHE_TTL)
+            owned.set_exception(e)
+            raise
+
+        with _cache_lock:
+            del _inflight_requests[prompt_hash]
+            if not response_text.startswith("Error:"):
+                _cache_response(prompt_hash, response_text)
+        owned.set_result(response_text)
         return response_text
 
     except Exception as e:
         logger.error(f"Error calling Claude: {str(e)}")
         return f"Error calling Claude: {str(e)}"
 
-def get_business_context_prompt(question, custom_keywords=""):
-    """Enhanced business prompt with strict formatting requirements"""
-    
-    prompt = f"""You are a senior business strategist. Provide strategic insights for this question.
+def claude_messages_stream(prompt, cache_key=None, system=None):
+    """Yield Claude's reply in text chunks as it is generated, caching the full reply like claude_messages"""
+    if not prompt or not prompt.strip():
+        yield "Error: Empty prompt provided"
+        return
+
+    prompt_hash = (BEDROCK_MODEL_ID, cache_key or hash_input(system or "", prompt))
+    with _cache_lock:
+        cached_response = _get_cached_response(prompt_hash)
+    if cached_response is not None:
+        logger.info("Using cached response")
+        yield cached_response
+        return
+
+    parts = []
+    try:
+        response = _send_claude_request("invoke_model_with_response_stream", prompt, system)
+        for event in response["body"]:
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            data = json_loads(chunk["bytes"])
+            if data.get("type") == "content_block_delta":
+                text = data["delta"].get("text", "")
+                parts.append(text)
+                yield text
+    except Exception as e:
+        logger.error(f"Error streaming from Claude: {str(e)}")
+        yield f"Error calling Claude: {str(e)}"
+        return
 
-Question: {question}
-Keywords: {custom_keywords}
+    if parts:
+        with _cache_lock:
+            _cache_response(prompt_hash, "".join(parts))
+
+# Static instructions and worked example shared by every business analysis. Sent as a system block, cache-marked
+# when BEDROCK_PROMPT_CACHING=1 so Bedrock reuses the processed prefix and only the short question part is new input
+BUSINESS_SYSTEM_PROMPT = """You are a senior business strategist. Provide strategic insights for the question you are given.
 
 CRITICAL: You must use EXACTLY this format:
 
@@ -261,17 +477,19 @@ Market Opportunities, Growth Strategy, Digital Innovation, Customer Experience,
 3. Future planning strategic positioning prepares organization for market evolution over five-year horizon addressing AI adoption, regulatory changes, industry consolidation. Market trend analysis identifies key drivers shaping competitive landscape enabling proactive strategy development. Strategic scenario planning evaluates technology disruption, new competitor entry, market maturation developing responsive strategies. Investment in emerging technologies totals $950K annually: AI research, blockchain exploration, IoT integration positioning for next-generation requirements. Long-term roadmap extends 30 months incorporating customer feedback, technology trends, competitive intelligence ensuring continued leadership.
 
 Provide specific numbers, percentages, dollar amounts, and timeframes in every action item."""
-    
-    return prompt
+
+def get_business_context_prompt(question, custom_keywords=""):
+    """Enhanced business prompt with strict formatting requirements, as (system prompt, user prompt)"""
+    return BUSINESS_SYSTEM_PROMPT, f"Question: {question}\nKeywords: {custom_keywords}"
 
 def get_business_context_prompt_with_content(question, custom_keywords="", content=""):
-    """Enhanced prompt that includes content analysis"""
+    """Enhanced prompt that includes content analysis, as (system prompt, user prompt)"""
     
     max_content_length = 1000
     if len(content) > max_content_length:
         content = content[:max_content_length] + "..."
     
-    prompt = f"""You are a senior business strategist. Analyze the provided content and deliver strategic insights.
+    prompt = f"""Analyze the provided content and deliver strategic insights.
 
 Question: {question}
 Keywords: {custom_keywords}
@@ -279,9 +497,43 @@ Content: {content}
 
 Use the same EXACT format as above with 5 keywords and detailed actions including specific numbers."""
     
-    return prompt
+    return BUSINESS_SYSTEM_PROMPT, prompt
+
+def get_keywords_prompt(question, custom_keywords=""):
+    """Prompt for the keyword line alone, as (system prompt, user prompt); shares the business system block"""
+    return BUSINESS_SYSTEM_PROMPT, (f"Question: {question}\nKeywords: {custom_keywords}\n"
+                                    "Respond with ONLY the **KEYWORDS IDENTIFIED:** heading and its line of exactly 5 keywords")
+
+def get_keyword_section_prompt(question, keyword, keyword_slot_idx):
+    """Prompt for one keyword's insights and actions, as (system prompt, user prompt); shares the business system block"""
+    return BUSINESS_SYSTEM_PROMPT, (f"Question: {question}\nKeyword: {keyword}\n"
+                                    f"Respond with ONLY this keyword's section, labeled **KEYWORD {keyword_slot_idx}: {keyword}**, "
+                                    "with its **INSIGHTS:** and **ACTIONS:** in the format above")
 
 def parse_enhanced_analysis_response(response):
+    """Parse a response, reusing the memoized parse of a repeated response"""
+    global _parse_cache_chars
+    with _cache_lock:
+        entry = _parse_cache.get(response)
+        if entry is not None:
+            _parse_cache.move_to_end(response)
+    if entry is not None:
+        # Copied so a caller editing its result cannot change what later hits return
+        return copy_parsed_response(entry[1])
+
+    parsed = _parse_response(response)
+    with _cache_lock:
+        if response not in _parse_cache:
+            # The key and the parsed insights each hold roughly the response's text
+            chars = 2 * len(response)
+            _parse_cache[response] = (chars, parsed)
+            _parse_cache_chars += chars
+            if len(_parse_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+                _parse_cache_chars -= _parse_cache.popitem(last=False)[1][0]
+            _trim_caches()
+    return copy_parsed_response(parsed)
+
+def _parse_response(response):
     try:
         if "**KEYWORDS IDENTIFIED:**" in response:
             return parse_standard_format(response)
@@ -294,9 +546,16 @@ def parse_enhanced_analysis_response(response):
         logger.error(f"Error parsing response: {str(e)}")
         return {"keywords": [], "structured_insights": {}}
 
+# Section markers of the standard format and the parser mode each one switches to
+_SECTION_MODES = {
+    "**KEYWORDS IDENTIFIED:**": "keywords",
+    "**INSIGHTS:**": "titles",
+    "**ACTIONS:**": "insights",
+}
+
 def parse_standard_format(response):
     """Parse properly formatted responses"""
-    lines = response.strip().split("\n")
+    lines = response.split("\n")
     keywords = []
     structured_insights = {}
     current_keyword = None
@@ -309,63 +568,43 @@ def parse_standard_format(response):
         if not line:
             continue
 
-        if line.startswith("**KEYWORDS IDENTIFIED:**"):
-            mode = "keywords"
-            continue
-
-        elif mode == "keywords" and not line.startswith("**"):
-            keyword_line = line.replace("[", "").replace("]", "")
-            keywords = [k.strip() for k in keyword_line.split(",") if k.strip()]
-            mode = None
-            continue
+        # Only bold lines can be section markers, so plain content lines skip the marker checks entirely
+        if line.startswith("**"):
+            section_mode = _SECTION_MODES.get(line[:line.find(":**") + 3])
+            if section_mode:
+                mode = section_mode
+            elif line.startswith("**KEYWORD") and ":" in line:
+                if current_keyword and (current_titles or current_insights):
+                    structured_insights[current_keyword] = {
+                        "titles": current_titles,
+                        "insights": current_insights
+                    }
 
-        elif line.startswith("**KEYWORD") and ":" in line:
-            if current_keyword and (current_titles or current_insights):
-                structured_insights[current_keyword] = {
-                    "titles": current_titles,
-                    "insights": current_insights
-                }
-            
-            if ":" in line:
                 keyword_part = line.split(":", 1)[1].strip()
-                current_keyword = keyword_part.replace("**", "").strip()
+                # Interned so section keys and the keyword list share one object per name, making lookups pointer compares
+                current_keyword = sys.intern(keyword_part.replace("**", "").strip())
                 current_titles = []
                 current_insights = []
             continue
 
-        elif line.startswith("**INSIGHTS:**"):
-            mode = "titles"
-            continue
-
-        elif line.startswith("**ACTIONS:**"):
-            mode = "insights"
-            continue
+        if mode == "keywords":
+            keyword_line = line.replace("[", "").replace("]", "")
+            keywords = [sys.intern(k.strip()) for k in keyword_line.split(",") if k.strip()]
+            mode = None
 
-        elif mode == "titles" and current_keyword:
-            if line and (line[0].isdigit() or line.startswith("- ")):
+        elif current_keyword and (mode == "titles" or mode == "insights"):
+            if line[0].isdigit() or line.startswith("- "):
                 if line[0].isdigit() and "." in line:
                     content = line.split(".", 1)[1].strip()
                 elif line.startswith("- "):
                     content = line[2:].strip()
                 else:
-                    content = line.strip()
-                
-                if content:
-                    current_titles.append(content)
+                    content = line
 
-        elif mode == "insights" and current_keyword:
-            if line and (line[0].isdigit() or line.startswith("- ")):
-                if line[0].isdigit() and "." in line:
-                    content = line.split(".", 1)[1].strip()
-                elif line.startswith("- "):
-                    content = line[2:].strip()
-                else:
-                    content = line.strip()
-                
                 if content:
-                    current_insights.append(content)
-            elif current_insights and not line.startswith("**"):
-                current_insights[-1] += " " + line.strip()
+                    (current_titles if mode == "titles" else current_insights).append(content)
+            elif mode == "insights" and current_insights:
+                current_insights[-1] += " " + line
 
     if current_keyword and (current_titles or current_insights):
         structured_insights[current_keyword] = {
@@ -387,7 +626,7 @@ def parse_alternative_format(response):
     for line in lines:
         if line.strip().startswith("Keywords:"):
             keyword_text = line.replace("Keywords:", "").strip()
-            keyword_matches = re.findall(r'\d+\.\s*([^0-9]+?)(?=\d+\.|$)', keyword_text)
+            keyword_matches = _NUMBERED_KEYWORD_RE.findall(keyword_text)
             keywords = [k.strip().rstrip('()').rstrip(':') for k in keyword_matches if k.strip()]
             break
     
@@ -453,6 +692,79 @@ def parse_fallback_format(response):
         "structured_insights": structured_insights
     }
 
+def cached_analysis(func):
+    """Memoize successful analysis results so repeat requests skip prompting and parsing"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _analysis_cache_chars
+        key = hash_input(func.__name__, *(repr(arg) for arg in args), *(f"{k}={v!r}" for k, v in sorted(kwargs.items())))
+        with _cache_lock:
+            cached = _analysis_cache.get(key)
+            if cached and time.monotonic() - cached[0] < ANALYSIS_CACHE_TTL:
+                _analysis_cache.move_to_end(key)
+            else:
+                cached = None
+        if cached:
+            logger.info(f"Using cached {func.__name__} result")
+            # Copied out and in, so edits a caller makes to its result never reach later cache hits
+            return copy.deepcopy(cached[1])
+
+        result = func(*args, **kwargs)
+
+        # Errors are never cached so a transient failure can be retried
+        failed = result.get("error") if isinstance(result, dict) else str(result).startswith("Error")
+        if not failed:
+            # A dict result holds its response text plus the parsed insights, roughly twice the response
+            chars = 2 * len(result.get("full_response") or "") if isinstance(result, dict) else len(str(result))
+            with _cache_lock:
+                previous = _analysis_cache.pop(key, None)
+                if previous is not None:
+                    _analysis_cache_chars -= previous[2]
+                _analysis_cache[key] = (time.monotonic(), copy.deepcopy(result), chars)
+                _analysis_cache_chars += chars
+                if len(_analysis_cache) > ANALYSIS_CACHE_MAX_ENTRIES:
+                    _analysis_cache_chars -= _analysis_cache.popitem(last=False)[1][2]
+                _trim_caches()
+        return result
+    return wrapper
+
+def active_keywords(keywords, structured_insights):
+    """Drop keywords whose section came back without titles or actions"""
+    if not structured_insights:
+        return keywords
+    active = []
+    for keyword in keywords:
+        keyword_data = structured_insights.get(keyword)
+        if keyword_data and (keyword_data.get("titles") or keyword_data.get("insights")):
+            active.append(keyword)
+    return active
+
+def normalize_query(text):
+    """Lowercase and collapse whitespace and trailing punctuation so near-identical questions share a cache key"""
+    return " ".join(text.lower().split()).rstrip("?.!") if text else ""
+
+def _analyze_keywords_in_parallel(question, custom_keywords, question_hash):
+    """Fetch the keywords, then each keyword's section concurrently; None when no keyword list comes back"""
+    system_prompt, user_prompt = get_keywords_prompt(question, custom_keywords)
+    keywords_response = claude_messages(user_prompt, cache_key=f"keywords:{question_hash}", system=system_prompt)
+    if keywords_response.startswith("Error"):
+        return None
+    keywords = parse_enhanced_analysis_response(keywords_response).get("keywords", [])[:5]
+    if not keywords:
+        return None
+
+    def section(slot):
+        keyword = keywords[slot - 1]
+        system_prompt, user_prompt = get_keyword_section_prompt(question, keyword, slot)
+        return claude_messages(user_prompt, cache_key=f"section:{question_hash}:{slot}:{keyword}", system=system_prompt)
+
+    # A partial answer would be cached as a success, so any failed section sends the caller to the single prompt
+    sections = list(_section_pool.map(section, range(1, len(keywords) + 1)))
+    if any(text.startswith("Error") for text in sections):
+        return None
+    return "**KEYWORDS IDENTIFIED:**\n" + ", ".join(keywords) + "\n\n**STRATEGIC ANALYSIS:**\n\n" + "\n\n".join(sections)
+
+@cached_analysis
 def analyze_question(question, custom_keywords=""):
     try:
         if not question or not question.strip():
@@ -463,13 +775,19 @@ def analyze_question(question, custom_keywords=""):
                 "full_response": ""
             }
 
-        analysis_id = hashlib.md5(f"{question}_{custom_keywords}".encode()).hexdigest()[:8]
-        full_prompt = get_business_context_prompt(question, custom_keywords)
-        
+        # One hash of the inputs gives both the analysis id and the response cache key; hashing the normalized
+        # text lets rewordings that differ only in case, spacing or trailing punctuation share one Bedrock answer
+        question_hash = hash_input(normalize_query(question), normalize_query(custom_keywords))
+        analysis_id = question_hash[:8]
+
         logger.info(f"Starting analysis {analysis_id} for question: {question[:50]}...")
         
-        response = claude_messages(full_prompt)
-        if response.startswith("Error:"):
+        # Five short concurrent generations finish far sooner than one long one; the single prompt is the fallback
+        response = _analyze_keywords_in_parallel(question, custom_keywords, question_hash) if PARALLEL_KEYWORD_ANALYSIS else None
+        if response is None:
+            system_prompt, user_prompt = get_business_context_prompt(question, custom_keywords)
+            response = claude_messages(user_prompt, cache_key=f"question:{question_hash}", system=system_prompt)
+        if response.startswith("Error"):
             return {
                 "error": response,
                 "keywords": [],
@@ -479,9 +797,10 @@ def analyze_question(question, custom_keywords=""):
             }
 
         parsed_result = parse_enhanced_analysis_response(response)
+        insights = parsed_result.get("structured_insights", {})
         return {
-            "keywords": parsed_result.get("keywords", []),
-            "insights": parsed_result.get("structured_insights", {}),
+            "keywords": active_keywords(parsed_result.get("keywords", []), insights),
+            "insights": insights,
             "full_response": response,
             "error": None,
             "analysis_id": analysis_id
@@ -497,6 +816,11 @@ def analyze_question(question, custom_keywords=""):
             "analysis_id": None
         }
 
+def analyze_questions_batch(questions, custom_keywords=""):
+    """Analyze several questions concurrently, returning results in the same order"""
+    return list(_bedrock_pool.map(lambda question: analyze_question(question, custom_keywords), questions))
+
+@cached_analysis
 def summarize_trends(text=None, question=None, keyword=None, return_format="dict"):
     try:
         if not any([text, question, keyword]):
@@ -527,11 +851,11 @@ def summarize_trends(text=None, question=None, keyword=None, return_format="dict
             custom_keywords = keyword
 
         if text:
-            enhanced_prompt = get_business_context_prompt_with_content(analysis_question, custom_keywords, text)
+            system_prompt, user_prompt = get_business_context_prompt_with_content(analysis_question, custom_keywords, text)
         else:
-            enhanced_prompt = get_business_context_prompt(analysis_question, custom_keywords)
+            system_prompt, user_prompt = get_business_context_prompt(analysis_question, custom_keywords)
 
-        response = claude_messages(enhanced_prompt)
+        response = claude_messages(user_prompt, system=system_prompt)
         
         if response.startswith("Error:"):
             if return_format == "string":
@@ -543,17 +867,17 @@ def summarize_trends(text=None, question=None, keyword=None, return_format="dict
                 "full_response": response
             }
 
-        parsed_result = parse_enhanced_analysis_response(response)
-        
         if return_format == "string":
             return response
         
+        parsed_result = parse_enhanced_analysis_response(response)
+        insights = parsed_result.get("structured_insights", {})
         return {
-            "keywords": parsed_result.get("keywords", []),
-            "insights": parsed_result.get("structured_insights", {}),
+            "keywords": active_keywords(parsed_result.get("keywords", []), insights),
+            "insights": insights,
             "full_response": response,
             "error": None,
-            "analysis_id": hashlib.md5(f"{analysis_question}_{custom_keywords}".encode()).hexdigest()[:8]
+            "analysis_id": hash_input(analysis_question, custom_keywords)[:8]
         }
 
     except Exception as e:
@@ -569,7 +893,6 @@ def summarize_trends(text=None, question=None, keyword=None, return_format="dict
         }
 
 def extract_text_from_file(uploaded_file, return_format="dict"):
-    tmp_path = None
     try:
         if not uploaded_file:
             error_msg = "No file provided"
@@ -582,11 +905,18 @@ def extract_text_from_file(uploaded_file, return_format="dict"):
                 "full_response": ""
             }
 
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            tmp.write(uploaded_file.read())
-            tmp_path = tmp.name
-
-        text = textract.process(tmp_path).decode("utf-8")
+        # Flask uploads expose .filename, Streamlit uploads expose .name
+        filename = getattr(uploaded_file, "filename", None) or getattr(uploaded_file, "name", "")
+        file_ext = os.path.splitext(filename)[1].lower()
+
+        # Repeat uploads of the same bytes skip extraction entirely
+        file_hash = hash_file(uploaded_file)
+        text = get_cached_file_text(file_hash, file_ext)
+        if text is None:
+            text = extract_upload_text(uploaded_file, file_ext)
+            if text is None:
+                raise ValueError(f"File type '{file_ext}' not supported - textract package required")
+            cache_file_text(file_hash, file_ext, text)
         
         if return_format == "string":
             return text
@@ -599,7 +929,8 @@ def extract_text_from_file(uploaded_file, return_format="dict"):
             return_format="dict"
         )
         
-        return analysis_result
+        # Hand back the extracted text too, so callers needing both do not extract the file a second time
+        return {**analysis_result, "extracted_text": text}
 
     except Exception as e:
         logger.error(f"Error extracting text: {str(e)}")
@@ -612,28 +943,20 @@ def extract_text_from_file(uploaded_file, return_format="dict"):
             "insights": {},
             "full_response": ""
         }
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.unlink(tmp_path)
-            except:
-                pass
 
+@cached_analysis
 def analyze_url_content(url, question=None, keyword=None):
+    if not WEB_FETCH_AVAILABLE:
+        return {
+            "error": "URL analysis requires 'requests' and 'beautifulsoup4' packages",
+            "keywords": [],
+            "insights": {},
+            "full_response": "",
+            "url": url
+        }
+
     try:
-        import requests
-        from bs4 import BeautifulSoup
-        
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        for script in soup(["script", "style", "nav", "header", "footer"]):
-            script.extract()
-        
-        text = soup.get_text()
-        text = ' '.join(text.split())
+        text = fetch_url_text(url)
         
         if len(text) > 2500:
             text = text[:2500] + "..."
@@ -645,8 +968,8 @@ def analyze_url_content(url, question=None, keyword=None):
             return_format="dict"
         )
         
-        analysis_result["url"] = url
-        return analysis_result
+        # Copy rather than tag the summarize_trends result, which may be a shared cached dict
+        return {**analysis_result, "url": url}
         
     except ImportError:
         return {
@@ -666,84 +989,106 @@ def analyze_url_content(url, question=None, keyword=None):
             "url": url
         }
 
-def safe_get_insight(analysis_result, keyword, insight_type="insights", index=0):
-    try:
-        if not analysis_result:
-            return "Error: analysis_result is empty"
+def analyze_urls_batch(urls, question=None, keyword=None):
+    """Fetch and analyze several URLs concurrently, returning results in the same order"""
+    return list(_bedrock_pool.map(lambda url: analyze_url_content(url, question, keyword), urls))
 
-        insights = analysis_result.get("insights", {})
-        if not insights:
-            return "Error: No insights found"
+def _insight_lookup_error(analysis_result, keyword, insight_type, index):
+    """Explain why safe_get_insight found nothing; only built on the failure path"""
+    if not analysis_result:
+        return "Error: analysis_result is empty"
 
-        keyword_data = insights.get(keyword)
-        if not keyword_data:
-            available = ", ".join(insights.keys())
-            return f"Error: Keyword '{keyword}' not found. Available: {available}"
+    insights = analysis_result.get("insights", {})
+    if not insights:
+        return "Error: No insights found"
 
-        items = keyword_data.get(insight_type)
-        if not isinstance(items, list):
-            return f"Error: Missing '{insight_type}' data"
+    keyword_data = insights.get(keyword)
+    if not keyword_data:
+        available = ", ".join(insights.keys())
+        return f"Error: Keyword '{keyword}' not found. Available: {available}"
 
-        if index >= len(items):
-            return f"Error: Index {index} out of range (total: {len(items)})"
+    items = keyword_data.get(insight_type)
+    if not isinstance(items, list):
+        return f"Error: Missing '{insight_type}' data"
 
-        return items[index]
+    return f"Error: Index {index} out of range (total: {len(items)})"
+
+def safe_get_insight(analysis_result, keyword, insight_type="insights", index=0):
+    if isinstance(keyword, str):
+        keyword = sys.intern(keyword)
+    # Index straight in on the common success path; the diagnostic walk only runs when that fails
+    try:
+        items = analysis_result["insights"][keyword][insight_type]
+        if isinstance(items, list):
+            return items[index]
+    except (KeyError, IndexError, TypeError):
+        pass
 
+    try:
+        return _insight_lookup_error(analysis_result, keyword, insight_type, index)
     except Exception as e:
         return f"Error retrieving insight: {str(e)}"
 
 def clear_cache():
-    global _response_cache
-    _response_cache.clear()
+    global _response_cache_chars, _parse_cache_chars, _analysis_cache_chars
+    with _cache_lock:
+        _response_cache.clear()
+        _response_cache_chars = 0
+        _parse_cache.clear()
+        _parse_cache_chars = 0
+        _analysis_cache.clear()
+        _analysis_cache_chars = 0
+    score_insight.cache_clear()
+    clear_url_cache()
+    clear_file_cache()
     logger.info("Cache cleared")
 
+# Terms rewarded by get_insight_quality_score, per category
+FINANCIAL_TERMS = ('$', '%', 'million', 'billion', 'revenue', 'roi', 'profit', 'cost', 'investment')
+MARKET_TERMS = ('market', 'customer', 'competitive', 'growth', 'share', 'segment')
+STRATEGY_TERMS = ('strategy', 'implementation', 'timeline', 'roadmap', 'metrics')
+
+@functools.lru_cache(maxsize=1024)
+def score_insight(insight):
+    """Score one insight out of 100; memoized since the same insights are rescored per analysis"""
+    score = 0
+    word_count = len(insight.split())
+    insight_lower = insight.lower()
+    
+    # Word count scoring (prefer 150-200 words)
+    if 150 <= word_count <= 200:
+        score += 80
+    elif 120 <= word_count < 150:
+        score += 65
+    elif 80 <= word_count < 120:
+        score += 50
+    elif word_count >= 200:
+        score += 70
+    else:
+        score += 25
+    
+    # Financial terms scoring
+    financial_count = sum(1 for term in FINANCIAL_TERMS if term in insight_lower)
+    score += min(financial_count * 4, 20)
+    
+    # Market terms scoring
+    market_count = sum(1 for term in MARKET_TERMS if term in insight_lower)
+    score += min(market_count * 2, 10)
+    
+    # Strategy terms scoring
+    strategy_count = sum(1 for term in STRATEGY_TERMS if term in insight_lower)
+    score += min(strategy_count * 2, 8)
+    
+    return min(score, 100)
+
 def get_insight_quality_score(insights_data):
     """Enhanced quality scoring system"""
     if not insights_data:
         return 0
     
-    total_score = 0
-    total_insights = 0
-    
-    for keyword, data in insights_data.items():
-        insights = data.get("insights", [])
-        for insight in insights:
-            score = 0
-            words = insight.split()
-            word_count = len(words)
-            insight_lower = insight.lower()
-            
-            # Word count scoring (prefer 150-200 words)
-            if 150 <= word_count <= 200:
-                score += 80
-            elif 120 <= word_count < 150:
-                score += 65
-            elif 80 <= word_count < 120:
-                score += 50
-            elif word_count >= 200:
-                score += 70
-            else:
-                score += 25
-            
-            # Financial terms scoring
-            financial_terms = ['$', '%', 'million', 'billion', 'revenue', 'roi', 'profit', 'cost', 'investment']
-            financial_count = sum(1 for term in financial_terms if term in insight_lower)
-            score += min(financial_count * 4, 20)
-            
-            # Market terms scoring
-            market_terms = ['market', 'customer', 'competitive', 'growth', 'share', 'segment']
-            market_count = sum(1 for term in market_terms if term in insight_lower)
-            score += min(market_count * 2, 10)
-            
-            # Strategy terms scoring
-            strategy_terms = ['strategy', 'implementation', 'timeline', 'roadmap', 'metrics']
-            strategy_count = sum(1 for term in strategy_terms if term in insight_lower)
-            score += min(strategy_count * 2, 8)
-            
-            total_score += min(score, 100)
-            total_insights += 1
-    
-    return (total_score / total_insights) if total_insights > 0 else 0
+    # One flat pass over every keyword's insights; each score is a memoized lookup after the first analysis
+    scores = [score_insight(insight) for data in insights_data.values() for insight in data.get("insights", [])]
+    return (sum(scores) / len(scores)) if scores else 0
 
 def parse_analysis_response(response):
     return parse_enhanced_analysis_response(response)
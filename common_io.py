@@ -0,0 +1,303 @@
+# Shared input helpers for app.py and app2.py: URL fetching, file text extraction and input hashing
+import time
+import shutil
+import tempfile
+import logging
+import threading
+import json
+import hashlib
+import importlib.util
+from collections import OrderedDict
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+try:
+    import docx2txt
+    DOCX2TXT_AVAILABLE = True
+except ImportError:
+    DOCX2TXT_AVAILABLE = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+# requests and bs4 are slow to import, so check once here that they are installed and import them on first use
+WEB_FETCH_AVAILABLE = (importlib.util.find_spec('requests') is not None
+                       and (SELECTOLAX_AVAILABLE or importlib.util.find_spec('bs4') is not None))
+_BeautifulSoup = None
+
+logger = logging.getLogger(__name__)
+
+# Guards the URL and file text caches, which request threads and batch workers share
+_cache_lock = threading.Lock()
+
+# Extracted page text keyed by URL, oldest first: {url: (fetched_at, text)}
+_url_text_cache = OrderedDict()
+URL_CACHE_TTL = 3600
+URL_CACHE_MAX_ENTRIES = 128
+
+# Page chrome dropped before taking the visible text
+BOILERPLATE_TAGS = ["script", "style", "nav", "header", "footer"]
+
+# Bedrock runtime clients keyed by (region, botocore Config), created on first use and shared across modules
+_bedrock_clients = {}
+_bedrock_client_lock = threading.Lock()
+
+# Pooled keep-alive HTTP session for page fetches, created on first use
+_http_session = None
+PAGE_MAX_BYTES = 2 * 1024 * 1024
+
+# Extracted upload text keyed by (hash of the raw file bytes, extension, character limit)
+_file_text_cache = OrderedDict()
+FILE_CACHE_MAX_ENTRIES = 32
+HASH_CHUNK_SIZE = 1 << 20
+
+# pdfium is not thread-safe, even across separate documents, so every call into it is serialized
+_pdfium_lock = threading.Lock()
+
+PLAIN_TEXT_EXTENSIONS = ['.txt', '.md']
+
+
+def _new_hasher():
+    """128-bit xxh3 when available, else 128-bit BLAKE2b (quicker than MD5 in CPython); same key width either way"""
+    return xxhash.xxh3_128() if XXHASH_AVAILABLE else hashlib.blake2b(digest_size=16)
+
+def json_dumps(payload):
+    """Serialize a request body; orjson returns bytes, which boto3 sends without re-encoding"""
+    return orjson.dumps(payload) if ORJSON_AVAILABLE else json.dumps(payload)
+
+def json_loads(body):
+    return orjson.loads(body) if ORJSON_AVAILABLE else json.loads(body)
+
+def copy_parsed_response(parsed):
+    """Copy a parsed analysis response's keyword list and insight containers; the strings themselves are shared"""
+    return {
+        "keywords": list(parsed["keywords"]),
+        "structured_insights": {
+            keyword: {"titles": list(data["titles"]), "insights": list(data["insights"])}
+            for keyword, data in parsed["structured_insights"].items()
+        },
+    }
+
+def hash_input(*parts):
+    """Fingerprint one or more strings for cache keys without joining them first"""
+    h = _new_hasher()
+    for i, part in enumerate(parts):
+        if i:
+            h.update(b"\0")
+        h.update(part.encode("utf-8", "ignore") if isinstance(part, str) else part)
+    return h.hexdigest()
+
+def hash_file(fileobj):
+    """Hash an open binary file in chunks and rewind it, without holding the whole file in memory"""
+    h = _new_hasher()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+        h.update(chunk)
+    fileobj.seek(0)
+    return h.hexdigest()
+
+def get_cached_file_text(file_hash, file_ext, max_chars=None):
+    with _cache_lock:
+        return _file_text_cache.get((file_hash, file_ext, max_chars))
+
+def cache_file_text(file_hash, file_ext, text, max_chars=None):
+    key = (file_hash, file_ext, max_chars)
+    with _cache_lock:
+        _file_text_cache.pop(key, None)
+        if len(_file_text_cache) >= FILE_CACHE_MAX_ENTRIES:
+            _file_text_cache.popitem(last=False)
+        _file_text_cache[key] = text
+
+def clear_file_cache():
+    with _cache_lock:
+        _file_text_cache.clear()
+
+def bedrock_client(config=None, region_name="us-east-1"):
+    """Return the process-wide Bedrock runtime client for a region and botocore Config, building it once"""
+    # Configs are module-level constants, so their identity is a stable key
+    key = (region_name, id(config))
+    client = _bedrock_clients.get(key)
+    if client is None:
+        # Double-checked so concurrent first requests do not each build a client
+        with _bedrock_client_lock:
+            client = _bedrock_clients.get(key)
+            if client is None:
+                import boto3
+                client = _bedrock_clients[key] = boto3.client("bedrock-runtime", region_name=region_name, config=config)
+    return client
+
+def _html_to_text(content):
+    """Return the visible text of an HTML page with whitespace collapsed to single spaces"""
+    if SELECTOLAX_AVAILABLE:
+        # lexbor is a C parser, far faster than bs4's pure-Python html.parser
+        tree = LexborHTMLParser(content)
+        tree.strip_tags(BOILERPLATE_TAGS)
+        return ' '.join(tree.root.text(separator=' ', strip=True).split()) if tree.root else ''
+
+    global _BeautifulSoup
+    if _BeautifulSoup is None:
+        from bs4 import BeautifulSoup as _BeautifulSoup
+
+    soup = _BeautifulSoup(content, 'html.parser')
+    for script in soup(BOILERPLATE_TAGS):
+        script.decompose()
+
+    # Walk the text nodes once, splitting each already-stripped string to collapse inner whitespace
+    return ' '.join(word for string in soup.stripped_strings for word in string.split())
+
+def _get_http_session():
+    """Return the shared requests session so repeat fetches reuse pooled TCP/TLS connections"""
+    global _http_session
+    if _http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http_session = session
+    return _http_session
+
+def warm_http_session():
+    """Import requests and build the shared session ahead of the first page fetch"""
+    if WEB_FETCH_AVAILABLE:
+        _get_http_session()
+
+def fetch_url_text(url):
+    """Fetch a web page and return its visible text, memoized per URL"""
+    with _cache_lock:
+        cached = _url_text_cache.get(url)
+    if cached and time.monotonic() - cached[0] < URL_CACHE_TTL:
+        logger.info(f"Using cached page text for {url}")
+        return cached[1]
+
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+    with _get_http_session().get(url, headers=headers, timeout=15, stream=True) as response:
+        response.raise_for_status()
+        # Stop downloading oversized pages; only the leading text is ever analyzed
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            received += len(chunk)
+            if received >= PAGE_MAX_BYTES:
+                break
+        content = b"".join(chunks)
+
+    text = _html_to_text(content)
+
+    # Drop any stale entry, then evict the oldest once the cache is full
+    with _cache_lock:
+        _url_text_cache.pop(url, None)
+        if len(_url_text_cache) >= URL_CACHE_MAX_ENTRIES:
+            _url_text_cache.popitem(last=False)
+        _url_text_cache[url] = (time.monotonic(), text)
+    return text
+
+def clear_url_cache():
+    with _cache_lock:
+        _url_text_cache.clear()
+
+def extract_pdf_text(source, max_chars=None):
+    """Extract text from a PDF path or bytes with pdfium, stopping early once max_chars are collected"""
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(source)
+        try:
+            parts = []
+            collected = 0
+            for i in range(len(pdf)):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+                collected += len(parts[-1]) + 1
+                if max_chars and collected >= max_chars:
+                    break
+        finally:
+            pdf.close()
+
+    text = "\n".join(parts)
+    return text[:max_chars] if max_chars else text
+
+def _read_plain_text(path, max_chars=None):
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read(max_chars) if max_chars else f.read()
+
+def _decode_text(raw, max_chars=None):
+    """Decode extractor output, slicing the bytes first so a bounded read never decodes the whole document"""
+    if not max_chars:
+        return raw.decode('utf-8')
+    # UTF-8 uses at most 4 bytes per character; a character cut at the slice edge is dropped
+    return raw[:max_chars * 4].decode('utf-8', errors='ignore')[:max_chars]
+
+def _extract_with_textract(path, file_ext, max_chars=None):
+    try:
+        import textract
+    except ImportError:
+        textract = None
+
+    if textract:
+        try:
+            return _decode_text(textract.process(path), max_chars)
+        except Exception:
+            if file_ext in PLAIN_TEXT_EXTENSIONS:
+                return _read_plain_text(path, max_chars)
+            raise
+
+    if file_ext in PLAIN_TEXT_EXTENSIONS:
+        return _read_plain_text(path, max_chars)
+    return None
+
+def extract_upload_text(fileobj, file_ext, max_chars=None):
+    """Extract text from an open upload, writing a temp file only for formats that need textract"""
+    fileobj.seek(0)
+    if file_ext in PLAIN_TEXT_EXTENSIONS:
+        # UTF-8 uses at most 4 bytes per character, so a bounded read never needs more bytes than this
+        raw = fileobj.read(max_chars * 4) if max_chars else fileobj.read()
+        text = raw.decode('utf-8', errors='ignore')
+        return text[:max_chars] if max_chars else text
+
+    if file_ext == '.pdf' and PDFIUM_AVAILABLE:
+        try:
+            text = extract_pdf_text(fileobj.read(), max_chars)
+            if text.strip():
+                return text
+        except Exception as e:
+            logger.warning(f"pdfium extraction failed, falling back to textract: {e}")
+        fileobj.seek(0)
+
+    # docx2txt is what textract runs for .docx; it reads the zip straight from the stream
+    if file_ext == '.docx' and DOCX2TXT_AVAILABLE:
+        try:
+            text = docx2txt.process(fileobj)
+            return text[:max_chars] if max_chars else text
+        except Exception as e:
+            logger.warning(f"docx2txt extraction failed, falling back to textract: {e}")
+        fileobj.seek(0)
+
+    # textract needs a path; the temp file is removed when the block exits, even if extraction fails
+    with tempfile.NamedTemporaryFile(suffix=file_ext) as tmp:
+        shutil.copyfileobj(fileobj, tmp)
+        tmp.flush()
+        return _extract_with_textract(tmp.name, file_ext, max_chars)
@@ -1,18 +1,21 @@
-import boto3
 import json
 import textract
 import tempfile
+import shutil
 import os
 import logging
-import hashlib
 import time
+import functools
+from collections import OrderedDict
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from common_io import hash_input, json_dumps, json_loads, copy_parsed_response, bedrock_client
+
+# Handlers and levels are configured by the caller, or in __main__ when run as a script
 logger = logging.getLogger(__name__)
 
-# Simple cache to prevent duplicate calls
-_response_cache = {}
+# Simple cache to prevent duplicate calls, evicting the least recently used response when full
+_response_cache = OrderedDict()
+RESPONSE_CACHE_MAX_ENTRIES = 512
 
 def summarize_trends(text=None, question=None, keyword=None):
     try:
@@ -49,7 +52,8 @@ def extract_text_from_file(uploaded_file):
             return "Error: No file provided"
 
         with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            tmp.write(uploaded_file.read())
+            # Copy in 1 MB chunks rather than reading the whole upload into memory first
+            shutil.copyfileobj(uploaded_file, tmp, length=1 << 20)
             tmp_path = tmp.name
 
         text = textract.process(tmp_path).decode("utf-8")
@@ -59,9 +63,12 @@ def extract_text_from_file(uploaded_file):
         logger.error(f"Error extracting text from file: {str(e)}")
         return f"Error extracting text: {str(e)}"
     finally:
-        if tmp_path and os.path.exists(tmp_path):
+        # Unlink directly instead of checking exists() first; a file that is already gone needs no cleanup
+        if tmp_path:
             try:
                 os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
             except Exception as cleanup_error:
                 logger.warning(f"Could not clean up temp file: {cleanup_error}")
 
@@ -71,14 +78,15 @@ def claude_messages(prompt):
             return "Error: Empty prompt provided"
 
         # Create a hash of the prompt to cache responses
-        prompt_hash = hashlib.md5(prompt.encode()).hexdigest()
+        prompt_hash = hash_input(prompt)
         
         # Check cache first
         if prompt_hash in _response_cache:
             logger.info("Using cached response")
+            _response_cache.move_to_end(prompt_hash)
             return _response_cache[prompt_hash]
 
-        bedrock = boto3.client("bedrock-runtime", region_name="us-east-1")
+        bedrock = bedrock_client()
         
         # Enhanced parameters for better, more detailed responses
         payload = {
@@ -96,10 +104,10 @@ def claude_messages(prompt):
             modelId="anthropic.claude-3-sonnet-20240229-v1:0",
             contentType="application/json",
             accept="application/json",
-            body=json.dumps(payload),
+            body=json_dumps(payload),
         )
 
-        result = json.loads(response["body"].read())
+        result = json_loads(response["body"].read())
         if not result or "content" not in result:
             return "Error: Invalid response structure from Claude"
         if not result["content"] or len(result["content"]) == 0:
@@ -109,6 +117,8 @@ def claude_messages(prompt):
         
         # Cache the response
         _response_cache[prompt_hash] = response_text
+        if len(_response_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+            _response_cache.popitem(last=False)
         
         return response_text
 
@@ -119,38 +129,8 @@ def claude_messages(prompt):
         logger.error(f"Error calling Claude: {str(e)}")
         return f"Error calling Claude: {str(e)}"
 
-def get_business_context_prompt(question, custom_keywords=""):
-    """Generate enhanced business-focused prompt with context gathering"""
-    
-    # Detect question type and customize approach
-    question_lower = question.lower()
-    
-    # Industry-specific prompts
-    industry_context = ""
-    if any(word in question_lower for word in ['retail', 'ecommerce', 'shopping', 'consumer']):
-        industry_context = "Focus on retail/ecommerce implications, customer behavior, and sales impact."
-    elif any(word in question_lower for word in ['tech', 'ai', 'digital', 'software']):
-        industry_context = "Focus on technology adoption, digital transformation, and innovation opportunities."
-    elif any(word in question_lower for word in ['healthcare', 'medical', 'pharma']):
-        industry_context = "Focus on healthcare implications, regulatory considerations, and patient outcomes."
-    elif any(word in question_lower for word in ['finance', 'fintech', 'banking']):
-        industry_context = "Focus on financial services impact, regulatory changes, and market dynamics."
-    
-    # Time-sensitive context
-    time_context = "Focus on 2024-2025 trends and emerging opportunities."
-    if any(word in question_lower for word in ['2024', '2025', 'future', 'upcoming']):
-        time_context = "Emphasize forward-looking insights and predictive analysis."
-    
-    return f"""You are a senior strategic market research analyst providing executive-level insights for business leaders. Your responses must be comprehensive, actionable, and business-focused.
-
-QUESTION: {question}
-CUSTOM KEYWORDS: {custom_keywords}
-
-ANALYSIS CONTEXT:
-{industry_context}
-{time_context}
-
-RESPONSE REQUIREMENTS:
+# Static requirements and answer format of the business prompt, built once instead of re-formatted on every call
+_BUSINESS_PROMPT_FORMAT = """RESPONSE REQUIREMENTS:
 - Each insight must be 150-250 words (substantial and detailed)
 - Include specific business implications and opportunities
 - Provide quantifiable metrics and trends when possible
@@ -223,6 +203,39 @@ CRITICAL: Each Business Action must be exactly 150-250 words and include:
 - Success measurement criteria
 - Real-world examples or case studies when relevant"""
 
+def get_business_context_prompt(question, custom_keywords=""):
+    """Generate enhanced business-focused prompt with context gathering"""
+    
+    # Detect question type and customize approach
+    question_lower = question.lower()
+    
+    # Industry-specific prompts
+    industry_context = ""
+    if any(word in question_lower for word in ['retail', 'ecommerce', 'shopping', 'consumer']):
+        industry_context = "Focus on retail/ecommerce implications, customer behavior, and sales impact."
+    elif any(word in question_lower for word in ['tech', 'ai', 'digital', 'software']):
+        industry_context = "Focus on technology adoption, digital transformation, and innovation opportunities."
+    elif any(word in question_lower for word in ['healthcare', 'medical', 'pharma']):
+        industry_context = "Focus on healthcare implications, regulatory considerations, and patient outcomes."
+    elif any(word in question_lower for word in ['finance', 'fintech', 'banking']):
+        industry_context = "Focus on financial services impact, regulatory changes, and market dynamics."
+    
+    # Time-sensitive context
+    time_context = "Focus on 2024-2025 trends and emerging opportunities."
+    if any(word in question_lower for word in ['2024', '2025', 'future', 'upcoming']):
+        time_context = "Emphasize forward-looking insights and predictive analysis."
+    
+    return f"""You are a senior strategic market research analyst providing executive-level insights for business leaders. Your responses must be comprehensive, actionable, and business-focused.
+
+QUESTION: {question}
+CUSTOM KEYWORDS: {custom_keywords}
+
+ANALYSIS CONTEXT:
+{industry_context}
+{time_context}
+
+""" + _BUSINESS_PROMPT_FORMAT
+
 def analyze_question(question, custom_keywords=""):
     try:
         if not question or not question.strip():
@@ -234,7 +247,7 @@ def analyze_question(question, custom_keywords=""):
             }
 
         # Create a unique identifier for this analysis
-        analysis_id = hashlib.md5(f"{question}_{custom_keywords}".encode()).hexdigest()[:8]
+        analysis_id = hash_input(question, custom_keywords)[:8]
         
         # Use the enhanced business-focused prompt
         full_prompt = get_business_context_prompt(question, custom_keywords)
@@ -270,7 +283,19 @@ def analyze_question(question, custom_keywords=""):
             "analysis_id": None
         }
 
+# Section headers of the answer format, looked up by the text up to and including the first ":**"
+_SECTION_MODES = {
+    "**KEYWORDS IDENTIFIED:**": "keywords",
+    "**STRATEGIC INSIGHTS:**": "titles",
+    "**BUSINESS ACTIONS:**": "insights",
+}
+
 def parse_enhanced_analysis_response(response):
+    return copy_parsed_response(_parse_response_cached(response))
+
+# Memoized per response text; callers get copies via parse_enhanced_analysis_response
+@functools.lru_cache(maxsize=RESPONSE_CACHE_MAX_ENTRIES)
+def _parse_response_cached(response):
     try:
         lines = response.strip().split("\n")
         keywords = []
@@ -285,41 +310,31 @@ def parse_enhanced_analysis_response(response):
             if not line:
                 continue
 
-            # Extract keywords
-            if line.startswith("**KEYWORDS IDENTIFIED:**"):
-                mode = "keywords"
-                continue
-
-            elif mode == "keywords" and not line.startswith("**"):
-                # Clean up keywords - remove brackets and extra formatting
-                keyword_line = line.replace("[", "").replace("]", "")
-                keywords = [k.strip() for k in keyword_line.split(",") if k.strip()]
-                mode = None
-                continue
-
-            # Extract keyword sections
-            elif line.startswith("**KEYWORD") and ":" in line:
-                # Save previous keyword data if exists
-                if current_keyword and (current_titles or current_insights):
-                    structured_insights[current_keyword] = {
-                        "titles": current_titles,
-                        "insights": current_insights
-                    }
-                
-                # Extract keyword name more reliably
-                if ":" in line:
+            # Headers and keyword labels are bold; anything else is list content for the current section
+            if line.startswith("**"):
+                section_mode = _SECTION_MODES.get(line[:line.find(":**") + 3])
+                if section_mode:
+                    mode = section_mode
+                elif line.startswith("**KEYWORD") and ":" in line:
+                    # Save previous keyword data if exists
+                    if current_keyword and (current_titles or current_insights):
+                        structured_insights[current_keyword] = {
+                            "titles": current_titles,
+                            "insights": current_insights
+                        }
+
+                    # Extract keyword name more reliably
                     keyword_part = line.split(":", 1)[1].strip()
                     current_keyword = keyword_part.replace("**", "").replace("[", "").replace("]", "").strip()
                     current_titles = []
                     current_insights = []
                 continue
 
-            elif line.startswith("**STRATEGIC INSIGHTS:**"):
-                mode = "titles"
-                continue
-
-            elif line.startswith("**BUSINESS ACTIONS:**"):
-                mode = "insights"
+            elif mode == "keywords":
+                # Clean up keywords - remove brackets and extra formatting
+                keyword_line = line.replace("[", "").replace("]", "")
+                keywords = [k.strip() for k in keyword_line.split(",") if k.strip()]
+                mode = None
                 continue
 
             # Extract content
@@ -369,10 +384,11 @@ def parse_enhanced_analysis_response(response):
         logger.info(f"Parsed {len(keywords)} keywords: {keywords}")
         logger.info(f"Structured insights for {len(structured_insights)} keywords")
         
-        # Log insight lengths for debugging
-        for kw, data in structured_insights.items():
-            avg_length = sum(len(insight) for insight in data.get("insights", [])) / max(len(data.get("insights", [])), 1)
-            logger.info(f"Keyword '{kw}': {len(data.get('insights', []))} insights, avg length: {avg_length:.0f} chars")
+        # Log insight lengths for debugging; the averages are only worth computing when INFO is on
+        if logger.isEnabledFor(logging.INFO):
+            for kw, data in structured_insights.items():
+                avg_length = sum(len(insight) for insight in data.get("insights", [])) / max(len(data.get("insights", [])), 1)
+                logger.info(f"Keyword '{kw}': {len(data.get('insights', []))} insights, avg length: {avg_length:.0f} chars")
         
         return {
             "keywords": keywords,
@@ -502,4 +518,5 @@ def test_functions():
         print(f"   💡 Insight Preview: {insight[:200]}...")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     test_functions()